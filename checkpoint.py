@@ -0,0 +1,89 @@
+"""
+Shared helpers for saving, loading and resuming the owners.json crawl output.
+"""
+
+import argparse
+import os
+
+import orjson
+
+
+def serialize_items(items, store_order):
+    """
+    Convert collected items into the owners.json layout.
+
+    Items are written in store listing order regardless of the order their
+    crawls finished in; items not in the listing keep their order at the end.
+
+    Args:
+        items (dict): Item ID -> {"name", "owners": {username: count}}.
+        store_order (dict): Item ID -> position in the store listing.
+
+    Returns:
+        dict: Items whose owners are lists of {"name", "count"} records.
+    """
+    ordered = sorted(items, key=lambda item_id: store_order.get(item_id, len(items)))
+    return {
+        item_id: {
+            "name": items[item_id]["name"],
+            "owners": [
+                {"name": name, "count": count}
+                for name, count in items[item_id]["owners"].items()
+            ],
+        }
+        for item_id in ordered
+    }
+
+
+def load_owners(items, filepath="owners.json"):
+    """
+    Load previously saved items and owners into `items`, if present.
+
+    Args:
+        items (dict): Item storage to fill, keyed by integer item ID.
+        filepath (str): Path to the JSON file written by save_owners.
+    """
+    if not os.path.exists(filepath):
+        return
+    with open(filepath, "rb") as f:
+        saved = orjson.loads(f.read())
+    for item_id, item in saved.items():
+        items[int(item_id)] = {
+            "name": item["name"],
+            "owners": {owner["name"]: owner["count"] for owner in item["owners"]},
+        }
+
+
+def save_owners(items, store_order, filepath="owners.json"):
+    """
+    Atomically save collected items and owners to a JSON file.
+
+    Args:
+        items (dict): Item ID -> {"name", "owners": {username: count}}.
+        store_order (dict): Item ID -> position in the store listing.
+        filepath (str): Path to the output JSON file.
+    """
+    data = serialize_items(items, store_order)
+    tmp_path = filepath + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS))
+    os.replace(tmp_path, filepath)
+
+
+def parse_args(description):
+    """
+    Parse the command line shared by the fetchers.
+
+    Args:
+        description (str): Help text describing the fetcher.
+
+    Returns:
+        argparse.Namespace: Parsed arguments with a boolean `resume`.
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="skip items already saved in owners.json by an interrupted run",
+    )
+    return parser.parse_args()
@@ -2,29 +2,72 @@
 Module for fetching items and owners from Polytoria's API.
 """
 
+import sys
 import time
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+
+import ijson
 import requests
+from requests.adapters import HTTPAdapter
+
+from checkpoint import load_owners, parse_args, save_owners
+from throttle import RateLimited, TokenBucket, backoff_delay, with_adaptive_retry
 
 # Global storage for fetched items and their owners
 items = {}
+# Position of each item in the store listing, used to order owners.json
+store_order = {}
 
 # API endpoints
-ITEMS_URL_TEMPLATE = (
+ITEMS_URL_PREFIX = (
     "https://polytoria.com/api/store/items?"
     "types[]=tool&types[]=face&types[]=hat&search=&sort=createdAt&"
-    "order=desc&showOffsale=false&collectiblesOnly=true&page={page}"
-)
-OWNERS_URL_TEMPLATE = (
-    "https://api.polytoria.com/v1/store/{item_id}/owners?limit=100&page={page}"
+    "order=desc&showOffsale=false&collectiblesOnly=true&page="
 )
+OWNERS_URL_PREFIX = "https://api.polytoria.com/v1/store/"
+OWNERS_URL_SUFFIX = "/owners?limit=100&page="
 
 # Request settings
 REQUEST_TIMEOUT = 30  # seconds
-RATE_LIMIT_DELAY = 10  # seconds between retries on 429
-PAGE_DELAY = 0.6  # seconds between successful page fetches
+RETRY_BASE_DELAY = 1  # seconds before the first retry, doubled per attempt
+RATE_LIMIT = 100  # requests allowed per RATE_PERIOD across all workers
+RATE_PERIOD = 60  # seconds
+MAX_CONCURRENCY = 16  # upper bound for adaptive in-flight requests
+ITEM_WORKERS = 8  # item pages and items crawled concurrently
+PAGE_WORKERS = MAX_CONCURRENCY - ITEM_WORKERS  # owner page threads shared by items
+
+# Shared session so connections to the API are kept alive and reused. Each
+# host's pool holds one connection per allowed in-flight request and blocks
+# instead of opening throwaway connections, so every concurrent page fetch
+# runs on an already warm connection.
+SESSION = requests.Session()
+SESSION.headers.update({"Accept-Encoding": "gzip", "Connection": "keep-alive"})
+_ADAPTER = HTTPAdapter(
+    pool_connections=2,
+    pool_maxsize=MAX_CONCURRENCY,
+    pool_block=True,
+    max_retries=0,
+)
+SESSION.mount("https://", _ADAPTER)
+SESSION.mount("https://api.polytoria.com", _ADAPTER)
+
+# Shared limiter pacing every request made by any worker
+LIMITER = TokenBucket(RATE_LIMIT, RATE_PERIOD)
+
+# Owner pages 2..N of every item share one pool, so item and page workers
+# together never exceed MAX_CONCURRENCY threads
+PAGE_POOL = ThreadPoolExecutor(max_workers=PAGE_WORKERS)
 
 
+@with_adaptive_retry(
+    max_concurrency=MAX_CONCURRENCY,
+    min_concurrency=1,
+    initial_concurrency=4,
+    overload_exception=RateLimited,
+    base_delay=RETRY_BASE_DELAY,
+)
 def fetch_items(page=1):
     """
     Fetch a page of store items.
@@ -35,10 +78,18 @@ def fetch_items(page=1):
     Returns:
         requests.Response: HTTP response object.
     """
-    url = ITEMS_URL_TEMPLATE.format(page=page)
-    return requests.get(url, timeout=REQUEST_TIMEOUT)
+    url = ITEMS_URL_PREFIX + str(page)
+    LIMITER.acquire()
+    return handle_rate_limit(SESSION.get(url, timeout=REQUEST_TIMEOUT))
 
 
+@with_adaptive_retry(
+    max_concurrency=MAX_CONCURRENCY,
+    min_concurrency=1,
+    initial_concurrency=4,
+    overload_exception=RateLimited,
+    base_delay=RETRY_BASE_DELAY,
+)
 def fetch_owners(item_id, page=1):
     """
     Fetch owner inventories for a given item and page.
@@ -48,102 +99,186 @@ def fetch_owners(item_id, page=1):
         page (int): Page number to fetch.
 
     Returns:
-        requests.Response: HTTP response object.
+        requests.Response: Streaming HTTP response; the caller must close it.
     """
-    url = OWNERS_URL_TEMPLATE.format(item_id=item_id, page=page)
-    return requests.get(url, timeout=REQUEST_TIMEOUT)
+    url = OWNERS_URL_PREFIX + str(item_id) + OWNERS_URL_SUFFIX + str(page)
+    LIMITER.acquire()
+    response = SESSION.get(url, stream=True, timeout=REQUEST_TIMEOUT)
+    return handle_rate_limit(response)
 
 
 def handle_rate_limit(response):
     """
-    Wait and retry if rate limited (HTTP 429).
+    Signal rate limiting (HTTP 429) to the adaptive retry wrapper.
 
     Args:
-        response (requests.Response): Initial response.
+        response (requests.Response): Response to check.
 
     Returns:
-        requests.Response: Final non-429 response.
+        requests.Response: The response, if it was not rate limited.
+
+    Raises:
+        RateLimited: If the response status is 429.
     """
-    while response.status_code == 429:
-        time.sleep(RATE_LIMIT_DELAY)
-        response = requests.get(response.url, timeout=REQUEST_TIMEOUT)
+    if response.status_code == 429:
+        response.close()
+        raise RateLimited(response.url)
     return response
 
 
-def process_all_items():
+def fetch_items_page(page):
     """
-    Iterate through all item pages, process each item's owners.
+    Fetch and decode one store items page, retrying on malformed JSON.
+
+    Args:
+        page (int): Page number to fetch.
+
+    Returns:
+        dict: Decoded items page.
     """
-    page = 1
+    attempt = 0
     while True:
         response = fetch_items(page)
-        response = handle_rate_limit(response)
         try:
-            data = response.json()
+            return response.json()
         except json.JSONDecodeError:
             print(f"Error parsing items page {page}. Retrying...")
-            time.sleep(RATE_LIMIT_DELAY)
-            continue
+            time.sleep(backoff_delay(attempt, RETRY_BASE_DELAY))
+            attempt += 1
 
+
+def process_all_items():
+    """
+    Fetch all item pages, then process each item's owners.
+
+    The first page is fetched alone to learn the page count; the remaining
+    item pages and the per-item owner crawls are then run on worker pools.
+    Items already present in the global items are skipped, and owners.json is
+    checkpointed after every completed item. Items whose crawl raises are
+    logged and left out.
+
+    Returns:
+        list: IDs of the items whose crawl failed.
+    """
+    data = fetch_items_page(1)
+    last_page = data.get("meta", {}).get("lastPage", 1)
+    pages_data = [data]
+    with ThreadPoolExecutor(max_workers=ITEM_WORKERS) as pool:
+        pages_data.extend(pool.map(fetch_items_page, range(2, last_page + 1)))
+
+    names = {}
+    for data in pages_data:
         for entry in data.get("data", []):
-            item_id = entry.get("id")
-            items[item_id] = {"name": entry.get("name", ""), "owners": []}
-            process_owners(item_id)
+            names[entry.get("id")] = entry.get("name", "")
 
-        last_page = data.get("meta", {}).get("lastPage", page)
-        if page >= last_page:
-            return
-        page += 1
-        time.sleep(PAGE_DELAY)
+    store_order.update((item_id, i) for i, item_id in enumerate(names))
+    pending = [item_id for item_id in names if item_id not in items]
+    with ThreadPoolExecutor(max_workers=ITEM_WORKERS) as pool:
+        futures = {
+            pool.submit(process_owners, item_id): item_id for item_id in pending
+        }
+        failed = []
+        for future in as_completed(futures):
+            item_id = futures[future]
+            try:
+                owners = future.result()
+            except Exception as e:
+                # Leave the item out so a --resume run crawls it again
+                print(f"Error crawling owners for item {item_id}: {e}. Skipping.")
+                failed.append(item_id)
+                continue
+            # Only finished items are added, so a checkpoint never holds partials
+            items[item_id] = {"name": names[item_id], "owners": owners}
+            save_owners(items, store_order)
+    return failed
 
 
-def process_owners(item_id):
+def fetch_owners_page(item_id, page):
     """
-    Process all owner inventory pages for a specific item.
+    Fetch one owner inventory page, retrying on malformed JSON.
+
+    The body is stream-parsed so only usernames and the page count are
+    materialized.
 
     Args:
         item_id (int | str): Store item ID.
+        page (int): Page number to fetch.
+
+    Returns:
+        tuple[list[str], int]: Usernames listed on the page and the page count.
     """
-    page = 1
+    attempt = 0
     while True:
         response = fetch_owners(item_id, page)
-        response = handle_rate_limit(response)
+        response.raw.decode_content = True
+        usernames = []
+        pages = 0
         try:
-            data = response.json()
-        except json.JSONDecodeError:
+            for prefix, _, value in ijson.parse(response.raw):
+                if prefix == "inventories.item.user.username":
+                    usernames.append(value)
+                elif prefix == "pages":
+                    pages = value
+            return usernames, pages
+        except ijson.JSONError:
             print(f"Error parsing owners for item {item_id}, page {page}. Retrying...")
-            time.sleep(RATE_LIMIT_DELAY)
-            continue
-
-        inventories = data.get("inventories", [])
-        if not inventories:
-            return
-
-        for inv in inventories:
-            user = inv.get("user", {})
-            username = user.get("username", "")
-            for owner in items[item_id]["owners"]:
-                if owner["name"] == username:
-                    owner["count"] += 1
-                    break
-            else:
-                items[item_id]["owners"].append({"name": username, "count": 1})
-
-        pages = data.get("pages", 0)
-        if page >= pages:
-            return
-        page += 1
-        time.sleep(PAGE_DELAY)
+            time.sleep(backoff_delay(attempt, RETRY_BASE_DELAY))
+            attempt += 1
+        finally:
+            response.close()
+
+
+def count_owners(owners, usernames):
+    """
+    Accumulate the owners listed on one inventory page.
+
+    Args:
+        owners (dict): Mapping of username to copies owned, updated in place.
+        usernames (list[str]): Usernames listed on the page.
+    """
+    for username in usernames:
+        owners[username] = owners.get(username, 0) + 1
+
+
+def process_owners(item_id):
+    """
+    Process all owner inventory pages for a specific item.
+
+    The first page is fetched alone to learn the page count; the remaining
+    pages are then fetched concurrently on the shared PAGE_POOL.
+
+    Args:
+        item_id (int | str): Store item ID.
+
+    Returns:
+        dict: Mapping of username to number of copies owned.
+    """
+    owners = {}
+    usernames, pages = fetch_owners_page(item_id, 1)
+    count_owners(owners, usernames)
+    if not usernames or pages <= 1:
+        return owners
+
+    fetch_page = partial(fetch_owners_page, item_id)
+    for usernames, _ in PAGE_POOL.map(fetch_page, range(2, pages + 1)):
+        count_owners(owners, usernames)
+    return owners
 
 
 def main():
     """
-    Main execution: process items and write owners.json with UTF-8 encoding.
+    Main execution: process items and write owners.json as compact UTF-8 JSON.
     """
-    process_all_items()
-    with open("owners.json", "w", encoding="utf-8") as f:
-        json.dump(items, f, indent=4)
+    args = parse_args(__doc__.strip())
 
+    if args.resume:
+        load_owners(items)
+    failed = process_all_items()
+    save_owners(items, store_order)
+    if failed:
+        # Fail the run so incomplete data is not published
+        print(f"{len(failed)} item(s) failed; rerun with --resume to retry them.")
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -3,113 +3,141 @@ Module for fetching items and owners from Polytoria with Cloudflare bypass using
 """
 
 import re
+import sys
 import time
 import json
 import requests
+from requests.adapters import HTTPAdapter
+
+from checkpoint import load_owners, parse_args, save_owners
+from throttle import RateLimited, TokenBucket, backoff_delay
 
 # Global storage for fetched items and their owners
 items = {}
+# Position of each item in the store listing, used to order owners.json
+store_order = {}
 
 # Constants
 BASE_API_PROXY = "http://localhost:20080/v1"
-ITEMS_URL_TEMPLATE = (
+ITEMS_URL_PREFIX = (
     "https://polytoria.com/api/store/items?"
     "types[]=tool&types[]=face&types[]=hat&search=&sort=createdAt&"
-    "order=desc&showOffsale=false&collectiblesOnly=true&page={page}"
-)
-OWNERS_URL_TEMPLATE = (
-    "https://api.polytoria.com/v1/store/{item_id}/owners?limit=100&page={page}"
+    "order=desc&showOffsale=false&collectiblesOnly=true&page="
 )
+OWNERS_URL_PREFIX = "https://api.polytoria.com/v1/store/"
+OWNERS_URL_SUFFIX = "/owners?limit=100&page="
 REQUEST_TIMEOUT = 60  # seconds
+RETRY_BASE_DELAY = 1  # seconds before the first retry, doubled per attempt
+RATE_LIMIT = 100  # requests allowed per RATE_PERIOD
+RATE_PERIOD = 60  # seconds
 
+# HTML tags the proxy wraps around the JSON body
+_TAG_RE = re.compile(rb"<[^>]*>")
 
-def fetch_items(page=1):
+# Shared session so the connection to the local proxy is kept alive and reused
+SESSION = requests.Session()
+SESSION.headers.update(
+    {"Content-Type": "application/json", "Connection": "keep-alive"}
+)
+SESSION.mount(
+    "http://", HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=0)
+)
+
+# Shared limiter pacing every request sent through the proxy
+LIMITER = TokenBucket(RATE_LIMIT, RATE_PERIOD)
+
+
+def _proxy_get(url, max_retries, label):
     """
-    Fetch a page of items, retrying on JSON or key errors.
+    Fetch a URL through the proxy, retrying on HTTP 429, JSON or key errors.
+
+    Every failure counts toward `max_retries` and is followed by an
+    exponential backoff with jitter.
 
     Args:
-        page (int): Page number to fetch.
+        url (str): Polytoria URL to fetch.
+        max_retries (int): Attempts before giving up.
+        label (str): Description of the page used in log messages.
 
     Returns:
-        str | None: Cleaned JSON string of items, or None on failure.
+        bytes | None: Cleaned JSON bytes of the response, or None on failure.
     """
-    max_retries = 5
+    payload = {
+        "cmd": "request.get",
+        "url": url,
+        "maxTimeout": REQUEST_TIMEOUT * 1000,
+    }
     for attempt in range(1, max_retries + 1):
+        LIMITER.acquire()
         try:
-            url = ITEMS_URL_TEMPLATE.format(page=page)
-            payload = {
-                "cmd": "request.get",
-                "url": url,
-                "maxTimeout": REQUEST_TIMEOUT * 1000,
-            }
-            response = requests.post(
+            response = SESSION.post(
                 BASE_API_PROXY,
-                headers={"Content-Type": "application/json"},
                 json=payload,
                 timeout=REQUEST_TIMEOUT,
             )
-            data = response.json()
-            solution = data["solution"]["response"]
-            return re.sub(r"<.*?>", "", solution)
-        except (KeyError, json.JSONDecodeError) as e:
+            solution = response.json()["solution"]
+            if solution.get("status") == 429:
+                raise RateLimited("HTTP 429")
+            return _TAG_RE.sub(b"", solution["response"].encode())
+        except (KeyError, json.JSONDecodeError, RateLimited) as e:
+            delay = backoff_delay(attempt - 1, RETRY_BASE_DELAY)
             print(
-                f"Error fetching items page {page}: {e}. "
-                f"Retry {attempt}/{max_retries} in 10 seconds..."
+                f"Error fetching {label}: {e}. "
+                f"Retry {attempt}/{max_retries} in {delay:.1f} seconds..."
             )
-            time.sleep(10)
-    print(f"Max retries ({max_retries}) reached for items page {page}. Skipping.")
+            time.sleep(delay)
+    print(f"Max retries ({max_retries}) reached for {label}. Skipping.")
     return None
 
 
+def fetch_items(page=1):
+    """
+    Fetch a page of items, retrying on HTTP 429, JSON or key errors.
+
+    Args:
+        page (int): Page number to fetch.
+
+    Returns:
+        bytes | None: Cleaned JSON bytes of items, or None on failure.
+    """
+    url = ITEMS_URL_PREFIX + str(page)
+    return _proxy_get(url, max_retries=5, label=f"items page {page}")
+
+
 def fetch_owners(item_id, page=1):
     """
-    Fetch a page of owners for a given item, retrying on JSON or key errors.
+    Fetch a page of owners for a given item, retrying on HTTP 429, JSON or key errors.
 
     Args:
         item_id (int | str): ID of the item to fetch owners for.
         page (int): Page number to fetch.
 
     Returns:
-        str | None: Cleaned JSON string of owners, or None on failure.
+        bytes | None: Cleaned JSON bytes of owners, or None on failure.
     """
-    max_retries = 7
-    for attempt in range(1, max_retries + 1):
-        try:
-            url = OWNERS_URL_TEMPLATE.format(item_id=item_id, page=page)
-            payload = {
-                "cmd": "request.get",
-                "url": url,
-                "maxTimeout": REQUEST_TIMEOUT * 1000,
-            }
-            response = requests.post(
-                BASE_API_PROXY,
-                headers={"Content-Type": "application/json"},
-                json=payload,
-                timeout=REQUEST_TIMEOUT,
-            )
-            data = response.json()
-            solution = data["solution"]["response"]
-            return re.sub(r"<.*?>", "", solution)
-        except (KeyError, json.JSONDecodeError) as e:
-            print(
-                f"Error fetching owners for item {item_id}, page {page}: {e}. "
-                f"Retry {attempt}/{max_retries} in 10 seconds..."
-            )
-            time.sleep(10)
-    print(
-        f"Max retries ({max_retries}) reached for item {item_id}, page {page}. Skipping."
+    url = OWNERS_URL_PREFIX + str(item_id) + OWNERS_URL_SUFFIX + str(page)
+    return _proxy_get(
+        url, max_retries=7, label=f"owners for item {item_id}, page {page}"
     )
-    return None
 
 
 def process_all_items():
     """
     Fetch all store items and process their owners into the global 'items' dict.
 
+    Items already present in 'items' are skipped, and owners.json is
+    checkpointed after every completed item. Items whose owner fetch gives up
+    are left out.
+
+    Returns:
+        list: IDs of the items whose owner fetch gave up.
+
     Raises:
         ValueError: If API response structure is invalid.
     """
+    failed = []
     page = 1
+    attempt = 0
     while True:
         response = fetch_items(page)
         if response is None:
@@ -120,8 +148,10 @@ def process_all_items():
             json_data = json.loads(response)
         except json.JSONDecodeError:
             print(f"Error parsing JSON for items page {page}. Retrying...")
-            time.sleep(10)
+            time.sleep(backoff_delay(attempt, RETRY_BASE_DELAY))
+            attempt += 1
             continue
+        attempt = 0
 
         data_list = json_data.get("data")
         if not isinstance(data_list, list):
@@ -131,15 +161,22 @@ def process_all_items():
 
         for entry in data_list:
             item_id = entry.get("id")
+            store_order.setdefault(item_id, len(store_order))
+            if item_id in items:
+                continue
             name = entry.get("name", "")
-            items[item_id] = {"name": name, "owners": []}
-            process_owners(item_id)
+            items[item_id] = {"name": name, "owners": {}}
+            if not process_owners(item_id):
+                # Leave the partial item out so a --resume run crawls it again
+                del items[item_id]
+                failed.append(item_id)
+                continue
+            save_owners(items, store_order)
 
         last_page = json_data.get("meta", {}).get("lastPage", page)
         if page >= last_page:
-            break
+            return failed
         page += 1
-        time.sleep(0.6)
 
 
 def process_owners(item_id):
@@ -148,61 +185,59 @@ def process_owners(item_id):
 
     Args:
         item_id (int | str): ID of the item to process.
+
+    Returns:
+        bool: True if every page was fetched, False if fetching gave up.
     """
     page = 1
+    attempt = 0
     while True:
         response = fetch_owners(item_id, page)
         if response is None:
             print(f"Stopping owner fetch for item {item_id} due to errors.")
-            break
+            return False
         try:
             json_data = json.loads(response)
         except json.JSONDecodeError:
             print(
                 f"Error parsing JSON for owners of item {item_id}, page {page}. Retrying..."
             )
-            time.sleep(10)
+            time.sleep(backoff_delay(attempt, RETRY_BASE_DELAY))
+            attempt += 1
             continue
+        attempt = 0
 
-        inventories = json_data.get("inventories", [])
+        # Keep only the rows and page count; drop the raw text and page dict
+        pages = json_data.get("pages", 0)
+        inventories = json_data.pop("inventories", None)
+        del json_data, response
         if not inventories:
-            break
+            return True
 
+        owners = items[item_id]["owners"]
         for inv in inventories:
             username = inv.get("user", {}).get("username", "")
-            # Find or append owner count
-            for owner in items[item_id]["owners"]:
-                if owner["name"] == username:
-                    owner["count"] += 1
-                    break
-            else:
-                items[item_id]["owners"].append({"name": username, "count": 1})
+            owners[username] = owners.get(username, 0) + 1
 
-        pages = json_data.get("pages", 0)
         if page >= pages:
-            break
+            return True
         page += 1
-        time.sleep(0.6)
-
-
-def save_owners(filepath="owners.json"):
-    """
-    Save the collected items and owners to a JSON file.
-
-    Args:
-        filepath (str): Path to the output JSON file.
-    """
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(items, f, indent=4)
 
 
 def main():
     """
     Main execution: process items and save results.
     """
-    process_all_items()
-    save_owners()
-
+    args = parse_args(__doc__.strip())
+
+    if args.resume:
+        load_owners(items)
+    failed = process_all_items()
+    save_owners(items, store_order)
+    if failed:
+        # Fail the run so incomplete data is not published
+        print(f"{len(failed)} item(s) failed; rerun with --resume to retry them.")
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
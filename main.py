@@ -2,10 +2,15 @@
 Main module for processing ownership data, updating README, and generating charts.
 """
 
-import json
+import re
+from heapq import nlargest
+from operator import itemgetter
 import matplotlib.pyplot as plt
-from matplotlib import colormaps as cm
 import numpy as np
+import orjson
+
+# The ten 'tab10' colors, sampled once at import
+_TAB10_COLORS = plt.get_cmap("tab10")(np.linspace(0, 1, 10))
 
 
 def generate_pie_chart(user_counts, title, filename):
@@ -17,8 +22,8 @@ def generate_pie_chart(user_counts, title, filename):
         title (str): Chart title.
         filename (str): Output SVG filename.
     """
-    labels = list(user_counts.keys())
-    values = list(user_counts.values())
+    labels = np.fromiter(user_counts.keys(), dtype=object, count=len(user_counts))
+    values = np.fromiter(user_counts.values(), dtype=np.int64, count=len(user_counts))
 
     plt.figure(figsize=(10, 8))
     plt.pie(values, labels=labels, autopct="%1.1f%%", startangle=140)
@@ -38,12 +43,11 @@ def generate_bar_chart(user_counts, title, filename):
         title (str): Chart title.
         filename (str): Output SVG filename.
     """
-    labels = list(user_counts.keys())
-    values = list(user_counts.values())
+    labels = np.fromiter(user_counts.keys(), dtype=object, count=len(user_counts))
+    values = np.fromiter(user_counts.values(), dtype=np.int64, count=len(user_counts))
 
-    # Use the 'tab10' colormap
-    colormap = cm.get_cmap("tab10")
-    colors = colormap(np.linspace(0, 1, len(labels)))
+    # Use the 'tab10' colors, repeating them if there are more than ten bars
+    colors = _TAB10_COLORS[np.arange(len(labels)) % len(_TAB10_COLORS)]
 
     plt.figure()
     bars = plt.bar(labels, values, color=colors)
@@ -53,41 +57,28 @@ def generate_bar_chart(user_counts, title, filename):
     plt.xticks(rotation=45, ha="right")
 
     # Annotate each bar with its height
-    for rect in bars:
-        height = rect.get_height()
-        plt.text(
-            rect.get_x() + rect.get_width() / 2,
-            height + 0.2,
-            f"{int(height)}",
-            ha="center",
-            va="bottom",
-            fontsize=8,
-        )
+    plt.bar_label(bars, labels=[str(v) for v in values.tolist()], padding=2, fontsize=8)
 
     plt.tight_layout()
     plt.savefig(filename)
     plt.close()
 
 
-def aggregate_others(user_counts, top_n=10):
+def aggregate_others(user_counts, top_n_dict, total):
     """
-    Aggregates all but the top N entries into an 'Others' category.
+    Adds an 'Others' category summing every entry not in the top entries.
 
     Args:
-        user_counts (dict): Mapping of labels to counts, assumed sorted descending.
-        top_n (int): Number of top entries to keep separately.
+        user_counts (dict): Mapping of all labels to counts.
+        top_n_dict (dict): Precomputed top entries, descending.
+        total (int): Sum of all counts in user_counts.
 
     Returns:
-        dict: Top N entries plus an 'Others' key summing the rest.
+        dict: The top entries plus an 'Others' key summing the rest.
     """
-    total = sum(user_counts.values())
-    if len(user_counts) <= top_n:
-        return user_counts.copy()
-
-    top_n_dict = dict(list(user_counts.items())[:top_n])
-    others_count = total - sum(top_n_dict.values())
-    top_n_dict["Others"] = others_count
-    return top_n_dict
+    if len(user_counts) <= len(top_n_dict):
+        return dict(top_n_dict)
+    return {**top_n_dict, "Others": total - sum(top_n_dict.values())}
 
 
 def process_data(file_path):
@@ -100,11 +91,10 @@ def process_data(file_path):
     Returns:
         tuple: (dict of user->count, int total count)
     """
+    with open(file_path, "rb") as f:
+        data = orjson.loads(f.read())
     user_counts = {}
     total_lims = 0
-
-    with open(file_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
     for record in data.values():
         for owner in record.get("owners", []):
             name = owner.get("name")
@@ -115,6 +105,42 @@ def process_data(file_path):
     return user_counts, total_lims
 
 
+def update_readme(total_lims, file_path="README.md"):
+    """
+    Rewrites every README fun fact line with the current total count.
+
+    The lines are overwritten in place when the new text fits, padding with
+    spaces; otherwise the whole file is rewritten.
+
+    Args:
+        total_lims (int): Total number of limited copies.
+        file_path (str): Path to the README file.
+    """
+    prefix = b"**Fun fact:** There are over "
+    new = f"**Fun fact:** There are over **{total_lims}** limited copies!".encode()
+    with open(file_path, "r+b") as f:
+        buf = f.read()
+        # Spans of every line starting with the prefix, newline excluded
+        pattern = re.compile(rb"^" + re.escape(prefix) + rb"[^\n]*", re.MULTILINE)
+        spans = [match.span() for match in pattern.finditer(buf)]
+        if not spans:
+            return
+        if all(len(new) <= eol - idx for idx, eol in spans):
+            for idx, eol in spans:
+                f.seek(idx)
+                f.write(new.ljust(eol - idx))
+            return
+        parts = []
+        last = 0
+        for idx, eol in spans:
+            parts += [buf[last:idx], new]
+            last = eol
+        parts.append(buf[last:])
+        f.seek(0)
+        f.write(b"".join(parts))
+        f.truncate()
+
+
 def main():
     """
     Main script entry point. Processes data, updates README, and generates charts.
@@ -123,20 +149,11 @@ def main():
     user_counts, total_lims = process_data("owners.json")
 
     # Update README.md fun fact
-    with open("README.md", "r", encoding="ascii") as f:
-        lines = f.readlines()
-    for idx, line in enumerate(lines):
-        if line.startswith("**Fun fact:** There are over "):
-            lines[idx] = (
-                f"**Fun fact:** There are over **{total_lims}** limited copies!\n"
-            )
-    with open("README.md", "w", encoding="ascii") as f:
-        f.writelines(lines)
-
-    # Sort users descending and prepare top entries
-    sorted_counts = dict(sorted(user_counts.items(), key=lambda x: x[1], reverse=True))
-    top_10 = dict(list(sorted_counts.items())[:10])
-    with_others = aggregate_others(sorted_counts, top_n=10)
+    update_readme(total_lims)
+
+    # Select the top entries without sorting every user
+    top_10 = dict(nlargest(10, user_counts.items(), key=itemgetter(1)))
+    with_others = aggregate_others(user_counts, top_10, total_lims)
 
     # Generate charts
     generate_pie_chart(
@@ -0,0 +1,174 @@
+"""
+Thread-safe helpers for pacing requests to Polytoria's API.
+"""
+
+import functools
+import random
+import threading
+import time
+
+
+class RateLimited(Exception):
+    """
+    Raised when the API answers with HTTP 429 Too Many Requests.
+    """
+
+
+def backoff_delay(attempt, base=1.0, cap=60.0):
+    """
+    Exponential backoff interval with jitter.
+
+    Args:
+        attempt (int): Zero-based retry attempt.
+        base (float): Delay in seconds for the first retry.
+        cap (float): Upper bound for the exponential part in seconds.
+
+    Returns:
+        float: Seconds to wait before the next attempt.
+    """
+    return min(cap, base * 2**attempt) + random.random()
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter shared by every worker thread.
+
+    Up to `max_rate` requests may be made per `time_period` seconds; unused
+    capacity accumulates so short bursts are served without waiting.
+
+    Args:
+        max_rate (float): Tokens refilled per period, also the bucket size.
+        time_period (float): Refill period in seconds.
+    """
+
+    def __init__(self, max_rate, time_period=1.0):
+        self.max_rate = max_rate
+        self.time_period = time_period
+        self._tokens = float(max_rate)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a token is available, then consume it.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                rate = self.max_rate / self.time_period
+                self._tokens = min(
+                    self.max_rate, self._tokens + (now - self._last) * rate
+                )
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / rate
+            time.sleep(wait)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limiter modelled on TCP congestion control (AIMD).
+
+    The allowed number of in-flight calls grows by roughly one per window of
+    successful calls and is halved whenever a call reports overload.
+
+    Args:
+        max_concurrency (int): Upper bound for the limit.
+        min_concurrency (int): Lower bound for the limit.
+        initial_concurrency (int): Starting limit.
+    """
+
+    def __init__(self, max_concurrency, min_concurrency=1, initial_concurrency=1):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = float(initial_concurrency)
+        self._in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """
+        Block until the number of in-flight calls is below the current limit.
+        """
+        with self._cond:
+            while self._in_flight >= int(self.limit):
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self, overloaded=False, adjust=True):
+        """
+        Release a slot and adjust the limit.
+
+        Args:
+            overloaded (bool): Whether the finished call hit an overload.
+            adjust (bool): Whether the outcome should change the limit at all.
+        """
+        with self._cond:
+            self._in_flight -= 1
+            if adjust and overloaded:
+                self.limit = max(self.min_concurrency, self.limit / 2)
+            elif adjust:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+
+def with_adaptive_retry(
+    max_concurrency=16,
+    min_concurrency=1,
+    initial_concurrency=4,
+    overload_exception=RateLimited,
+    base_delay=1.0,
+):
+    """
+    Decorate a fetcher with adaptive concurrency and retry on overload.
+
+    Calls are admitted through an AdaptiveLimiter. When the wrapped function
+    raises `overload_exception` the limit shrinks and the call is retried after
+    an exponential backoff with jitter; successful calls grow the limit. Other
+    exceptions are re-raised without changing the limit.
+
+    Args:
+        max_concurrency (int): Upper bound for concurrent calls.
+        min_concurrency (int): Lower bound for concurrent calls.
+        initial_concurrency (int): Starting number of concurrent calls.
+        overload_exception (type[Exception]): Exception signalling overload.
+        base_delay (float): Delay in seconds for the first retry.
+
+    Returns:
+        Callable: Decorator applying the limiter.
+    """
+
+    def decorator(func):
+        limiter = AdaptiveLimiter(max_concurrency, min_concurrency, initial_concurrency)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            attempt = 0
+            while True:
+                limiter.acquire()
+                try:
+                    result = func(*args, **kwargs)
+                except overload_exception:
+                    limiter.release(overloaded=True)
+                    time.sleep(backoff_delay(attempt, base_delay))
+                    attempt += 1
+                    continue
+                except BaseException:
+                    # Not a success either, so leave the limit unchanged
+                    limiter.release(adjust=False)
+                    raise
+                limiter.release()
+                return result
+
+        wrapper.limiter = limiter
+        return wrapper
+
+    return decorator